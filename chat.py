@@ -1,6 +1,5 @@
 import os
-import json
-from datetime import datetime
+import orjson
 from typing import List, Dict
 import openai
 from pathlib import Path
@@ -22,28 +21,72 @@ class ChatApp:
         
         # Initialize conversation history
         self.messages: List[Dict] = []
-        self.history_file = Path('chat_history.json')
+        self.history_file = Path('chat_history.jsonl')
+        self.legacy_history_file = Path('chat_history.json')
         
         # Load existing history if available
         self.load_history()
 
+    def import_legacy_history(self) -> None:
+        """Convert a chat_history.json file from earlier versions into the JSON Lines log, once."""
+        if self.history_file.exists() or not self.legacy_history_file.exists():
+            return
+            
+        try:
+            with open(self.legacy_history_file, 'rb') as f:
+                messages = orjson.loads(f.read())
+        except orjson.JSONDecodeError:
+            print(f"Could not import {self.legacy_history_file}; it was left unchanged.")
+            return
+            
+        tmp_file = self.history_file.with_suffix('.jsonl.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(b"".join(orjson.dumps(msg) + b"\n" for msg in messages))
+        os.replace(tmp_file, self.history_file)
+        print(f"Imported {len(messages)} messages from {self.legacy_history_file}.")
+
     def load_history(self) -> None:
-        """Load chat history from file if it exists."""
-        if self.history_file.exists():
-            try:
-                with open(self.history_file, 'r') as f:
-                    self.messages = json.load(f)
-                print("Previous chat history loaded.")
-            except json.JSONDecodeError:
-                print("Error loading chat history. Starting fresh.")
-                self.messages = []
-        else:
-            self.messages = []
+        """Load chat history from file if it exists, skipping unreadable records."""
+        self.messages = []
+        self.saved_count = 0
+        self.import_legacy_history()
+        if not self.history_file.exists():
+            return
+            
+        skipped = 0
+        line = b""
+        with open(self.history_file, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    self.messages.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    skipped += 1
+                    
+        # A write torn by a crash leaves no trailing newline; end the line so later appends stay separate
+        if line and not line.endswith(b"\n"):
+            with open(self.history_file, 'ab') as f:
+                f.write(b"\n")
+                
+        self.saved_count = len(self.messages)
+        if skipped:
+            print(f"Skipped {skipped} unreadable chat history record(s).")
+        print("Previous chat history loaded.")
 
     def save_history(self) -> None:
-        """Save chat history to file."""
-        with open(self.history_file, 'w') as f:
-            json.dump(self.messages, f, indent=2)
+        """Append messages not yet written to the chat history file, one JSON record per line."""
+        new_messages = self.messages[self.saved_count:]
+        with open(self.history_file, 'ab') as f:
+            f.write(b"".join(orjson.dumps(msg) + b"\n" for msg in new_messages))
+        self.saved_count = len(self.messages)
+
+    def clear_history(self) -> None:
+        """Clear chat history in memory and truncate the history file."""
+        self.messages = []
+        self.saved_count = 0
+        with open(self.history_file, 'wb'):
+            pass
 
     def get_ai_response(self, user_input: str) -> str:
         """Get response from OpenAI API."""
@@ -63,7 +106,7 @@ class ChatApp:
             ai_response = response.choices[0].message.content
             self.messages.append({"role": "assistant", "content": ai_response})
             
-            # Save updated history
+            # Append new messages to the history file
             self.save_history()
             
             return ai_response
@@ -78,18 +121,18 @@ class ChatApp:
         
         while True:
             user_input = input("\nYou: ").strip()
+            command = user_input.lower()
             
-            if user_input.lower() == 'quit':
+            if command == 'quit':
                 print("Goodbye!")
                 break
                 
-            elif user_input.lower() == 'new':
-                self.messages = []
-                self.save_history()
+            elif command == 'new':
+                self.clear_history()
                 print("\nStarting new chat...")
                 continue
                 
-            elif user_input.lower() == 'history':
+            elif command == 'history':
                 print("\nChat History:")
                 for msg in self.messages:
                     role = "You" if msg["role"] == "user" else "AI"
@@ -1,12 +1,9 @@
 import os
-import json
+import orjson
 import re
 import base64
-import asyncio
 import threading
-import time
-from datetime import datetime
-from typing import List, Dict, Union, Tuple
+from typing import List, Dict, Union, Tuple, Optional
 import openai
 from pathlib import Path
 from dotenv import load_dotenv
@@ -14,6 +11,23 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Matches image references enclosed in double braces, e.g. {{image_url}}
+_IMG_RE = re.compile(r'\{\{([^{}]*)\}\}')
+
+
+def _sniff_image_mime(header: bytes) -> str:
+    """Detect an image MIME type from the file's magic bytes, defaulting to JPEG."""
+    if header.startswith(b'\x89PNG'):
+        return "image/png"
+    if header.startswith(b'\xff\xd8\xff'):
+        return "image/jpeg"
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return "image/webp"
+    if header.startswith(b'GIF8'):
+        return "image/gif"
+    return "image/jpeg"
+
+
 class ChatApp:
     def __init__(self):
         # Initialize OpenAI client
@@ -27,7 +41,8 @@ class ChatApp:
         
         # Initialize conversation history
         self.messages: List[Dict] = []
-        self.history_file = Path('chat_history.json')
+        self.history_file = Path('chat_history.jsonl')
+        self.legacy_history_file = Path('chat_history.json')
         
         # Load existing history if available
         self.load_history()
@@ -38,63 +53,112 @@ class ChatApp:
         # Store the last response
         self.last_response = ""
 
+    def import_legacy_history(self) -> None:
+        """Convert a chat_history.json file from earlier versions into the JSON Lines log, once."""
+        if self.history_file.exists() or not self.legacy_history_file.exists():
+            return
+            
+        try:
+            with open(self.legacy_history_file, 'rb') as f:
+                messages = orjson.loads(f.read())
+        except orjson.JSONDecodeError:
+            print(f"Could not import {self.legacy_history_file}; it was left unchanged.")
+            return
+            
+        tmp_file = self.history_file.with_suffix('.jsonl.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(b"".join(orjson.dumps(msg) + b"\n" for msg in messages))
+        os.replace(tmp_file, self.history_file)
+        print(f"Imported {len(messages)} messages from {self.legacy_history_file}.")
+
     def load_history(self) -> None:
-        """Load chat history from file if it exists."""
-        if self.history_file.exists():
-            try:
-                with open(self.history_file, 'r') as f:
-                    self.messages = json.load(f)
-                print("Previous chat history loaded.")
-            except json.JSONDecodeError:
-                print("Error loading chat history. Starting fresh.")
-                self.messages = []
-        else:
-            self.messages = []
+        """Load chat history from file if it exists, skipping unreadable records."""
+        self.messages = []
+        self.saved_count = 0
+        self.import_legacy_history()
+        if not self.history_file.exists():
+            return
+            
+        skipped = 0
+        line = b""
+        with open(self.history_file, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    self.messages.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    skipped += 1
+                    
+        # A write torn by a crash leaves no trailing newline; end the line so later appends stay separate
+        if line and not line.endswith(b"\n"):
+            with open(self.history_file, 'ab') as f:
+                f.write(b"\n")
+                
+        self.saved_count = len(self.messages)
+        if skipped:
+            print(f"Skipped {skipped} unreadable chat history record(s).")
+        print("Previous chat history loaded.")
 
     def save_history(self) -> None:
-        """Save chat history to file."""
-        with open(self.history_file, 'w') as f:
-            json.dump(self.messages, f, indent=2)
+        """Append messages not yet written to the chat history file, one JSON record per line."""
+        new_messages = self.messages[self.saved_count:]
+        with open(self.history_file, 'ab') as f:
+            f.write(b"".join(orjson.dumps(msg) + b"\n" for msg in new_messages))
+        self.saved_count = len(self.messages)
+
+    def clear_history(self) -> None:
+        """Clear chat history in memory and truncate the history file."""
+        self.messages = []
+        self.saved_count = 0
+        with open(self.history_file, 'wb'):
+            pass
 
-    def extract_image_references(self, text: str) -> Tuple[List[str], List[str]]:
+    def extract_image_references(self, text: str) -> Tuple[str, List[str], List[str]]:
         """
         Extract image URLs and file paths enclosed in double braces from text.
-        Returns tuple of (urls, file_paths)
+        Returns tuple of (clean_text, urls, file_paths) built in a single pass.
         """
-        pattern = r'\{\{(.*?)\}\}'
-        references = re.findall(pattern, text)
-        
+        parts = []
         urls = []
         file_paths = []
+        last_end = 0
         
-        for ref in references:
-            ref = ref.strip()
+        for match in _IMG_RE.finditer(text):
+            parts.append(text[last_end:match.start()])
+            last_end = match.end()
+            ref = match.group(1).strip()
             # Determine if it's a URL or file path
             if ref.startswith(('http://', 'https://')):
                 urls.append(ref)
             else:
                 # Treat as file path
                 file_paths.append(ref)
+        parts.append(text[last_end:])
                 
-        return urls, file_paths
+        return "".join(parts).strip(), urls, file_paths
     
-    def encode_image_to_base64(self, image_path: str) -> str:
-        """Encode an image file to base64."""
+    def encode_image_to_base64(self, image_path: str) -> Optional[Tuple[str, str]]:
+        """
+        Encode an image file to base64.
+        Returns tuple of (mime_type, base64_data)
+        """
         try:
             with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+                data = image_file.read()
+            return _sniff_image_mime(data[:12]), base64.b64encode(data).decode('ascii')
+        except FileNotFoundError:
+            print(f"Warning: Image file not found: {image_path}")
+            return None
         except Exception as e:
             print(f"Error encoding image {image_path}: {str(e)}")
             return None
 
-    def create_message_content(self, text: str, image_urls: List[str], image_paths: List[str]) -> Union[str, List[Dict]]:
-        """Create message content with text, image URLs, and local image files."""
+    def create_message_content(self, clean_text: str, image_urls: List[str], image_paths: List[str]) -> Union[str, List[Dict]]:
+        """Create message content with text (placeholders already removed), image URLs, and local image files."""
         if not image_urls and not image_paths:
-            return text
+            return clean_text
 
-        # Remove the image placeholders from the text
-        clean_text = re.sub(r'\{\{.*?\}\}', '', text).strip()
-        
         # Create content list with text and images
         content = []
         
@@ -116,18 +180,14 @@ class ChatApp:
             
         # Add local images (file paths)
         for path in image_paths:
-            # Skip if path doesn't exist
-            if not os.path.exists(path):
-                print(f"Warning: Image file not found: {path}")
-                continue
-                
-            # Encode image to base64
-            base64_image = self.encode_image_to_base64(path)
-            if base64_image:
+            # Encode image to base64, skipping files that could not be read
+            encoded_image = self.encode_image_to_base64(path)
+            if encoded_image:
+                mime_type, base64_image = encoded_image
                 content.append({
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{base64_image}"
+                        "url": f"data:{mime_type};base64,{base64_image}"
                     }
                 })
             
@@ -136,10 +196,10 @@ class ChatApp:
     def get_ai_response_streaming(self, user_input: str) -> None:
         """Get streaming response from OpenAI API."""
         # Extract image references from input
-        image_urls, image_paths = self.extract_image_references(user_input)
+        clean_text, image_urls, image_paths = self.extract_image_references(user_input)
         
         # Create message content
-        content = self.create_message_content(user_input, image_urls, image_paths)
+        content = self.create_message_content(clean_text, image_urls, image_paths)
         
         # Add user message to history
         self.messages.append({
@@ -183,7 +243,7 @@ class ChatApp:
                 "content": full_response
             })
             
-            # Save updated history
+            # Append new messages to the history file
             self.save_history()
             
             # Store the complete response
@@ -228,8 +288,7 @@ class ChatApp:
         thread.start()
         
         # Wait for the thread to complete
-        while thread.is_alive():
-            time.sleep(0.1)
+        thread.join()
 
     def start_chat(self) -> None:
         """Start the chat interface."""
@@ -241,18 +300,18 @@ class ChatApp:
         
         while True:
             user_input = input("\nYou: ").strip()
+            command = user_input.lower()
             
-            if user_input.lower() == 'quit':
+            if command == 'quit':
                 print("Goodbye!")
                 break
                 
-            elif user_input.lower() == 'new':
-                self.messages = []
-                self.save_history()
+            elif command == 'new':
+                self.clear_history()
                 print("\nStarting new chat...")
                 continue
                 
-            elif user_input.lower() == 'history':
+            elif command == 'history':
                 print("\nChat History:")
                 for msg in self.messages:
                     role = "You" if msg["role"] == "user" else "AI"
@@ -1,12 +1,13 @@
 import os
-import json
+import atexit
+import orjson
 import re
 import base64
+import hashlib
 import asyncio
-import threading
-import time
-from datetime import datetime
-from typing import List, Dict, Union, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Union, Tuple, Optional
+import httpx
 import openai
 from pathlib import Path
 from dotenv import load_dotenv
@@ -14,87 +15,368 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Matches image references enclosed in double braces, e.g. {{image_url}}
+_IMG_RE = re.compile(r'\{\{([^{}]*)\}\}')
+
+# Read size for base64 encoding; a multiple of 3 so encoded chunks join without padding
+_B64_CHUNK_SIZE = 57 * 1024
+
+# Upper bound on threads used to read and encode local images concurrently
+_MAX_ENCODE_WORKERS = 8
+
+# Upper bound on concurrent API requests made by batch()
+_MAX_BATCH_CONCURRENCY = 8
+
+# Shared connection pool so every OpenAI client reuses keep-alive connections;
+# created on first use by _get_http_client()
+_HTTP: Optional[httpx.Client] = None
+
+# Prompt size above which older messages are collapsed into a summary
+_HISTORY_TOKEN_LIMIT = 4000
+
+# Token budget for the newest messages kept verbatim when older ones are summarized
+_KEEP_RECENT_TOKENS = 2000
+
+# Rough token cost of an image part when sizing the prompt
+_IMAGE_TOKEN_ESTIMATE = 85
+
+# Tokenizer loaded by _get_encoding(); False once loading has failed so it isn't retried
+_ENCODING = None
+
+
+def _get_http_client() -> httpx.Client:
+    """Return the shared HTTP connection pool, creating it on first use."""
+    global _HTTP
+    if _HTTP is None:
+        _HTTP = httpx.Client(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+            http2=True
+        )
+        atexit.register(close_http_client)
+    return _HTTP
+
+
+def close_http_client() -> None:
+    """Close the shared HTTP connection pool; runs automatically at interpreter exit."""
+    global _HTTP
+    if _HTTP is not None:
+        _HTTP.close()
+        _HTTP = None
+
+
+def _get_encoding() -> Optional["tiktoken.Encoding"]:
+    """Load the tokenizer once, on first use; returns None if it could not be loaded."""
+    global _ENCODING
+    if _ENCODING is None:
+        try:
+            # Imported here so sessions that never send a prompt skip the cost
+            import tiktoken
+            _ENCODING = tiktoken.encoding_for_model("gpt-4o-mini")
+        except Exception as e:
+            print(f"Error loading tokenizer, chat history will not be summarized: {str(e)}")
+            _ENCODING = False
+    return _ENCODING or None
+
+
+def _sniff_image_mime(header: bytes) -> str:
+    """Detect an image MIME type from the file's magic bytes, defaulting to JPEG."""
+    if header.startswith(b'\x89PNG'):
+        return "image/png"
+    if header.startswith(b'\xff\xd8\xff'):
+        return "image/jpeg"
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return "image/webp"
+    if header.startswith(b'GIF8'):
+        return "image/gif"
+    return "image/jpeg"
+
+
+def _format_image_part(item: Dict) -> str:
+    """Format an image content part for display in history."""
+    url = item["image_url"].get("url", "")
+    # For local images (base64), show a placeholder instead of the entire string
+    if url.startswith("data:image"):
+        return "[Local image]"
+    return f"[Image: {url}]"
+
+
+# Display formatters for message content parts, keyed by part type
+_HISTORY_PART_FORMATTERS = {
+    "text": lambda item: item["text"],
+    "image_url": _format_image_part,
+}
+
 class ChatApp:
     def __init__(self):
-        # Initialize OpenAI client
+        # OpenAI client is created on first use
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in .env file")
             
-        self.client = openai.OpenAI(
-            api_key=api_key
-        )
+        self._api_key = api_key
+        self._client: Optional[openai.OpenAI] = None
         
-        # Initialize conversation history
+        # Initialize conversation history; image references make this log unreadable
+        # by the other scripts, so it is kept separate from chat_history.jsonl
         self.messages: List[Dict] = []
-        self.history_file = Path('chat_history.json')
+        self.history_file = Path('chat_history_v2.jsonl')
+        self.legacy_history_file = Path('chat_history.json')
+        
+        # Local image payloads are stored once in a sidecar directory, keyed by SHA-1
+        self.image_dir = Path('chat_history_images')
+        self._image_refs: Dict[str, str] = {}
+        
+        # Encoded data URLs keyed by path as (mtime, size, data_url); messages share the cached string
+        self._image_cache: Dict[str, Tuple[float, int, str]] = {}
         
         # Load existing history if available
         self.load_history()
         
-        # Flag to track if response is being generated
-        self.is_generating = False
-        
         # Store the last response
         self.last_response = None
 
+    @property
+    def client(self) -> openai.OpenAI:
+        """OpenAI client, created on first access."""
+        if self._client is None:
+            self._client = openai.OpenAI(
+                api_key=self._api_key,
+                http_client=_get_http_client()
+            )
+        return self._client
+
+    def close(self) -> None:
+        """Release this instance's OpenAI client; the shared pool stays open for other instances."""
+        self._client = None
+
+    def import_legacy_history(self) -> None:
+        """Convert a chat_history.json file from earlier versions into the JSON Lines log, once."""
+        if self.history_file.exists() or not self.legacy_history_file.exists():
+            return
+            
+        try:
+            with open(self.legacy_history_file, 'rb') as f:
+                messages = orjson.loads(f.read())
+        except orjson.JSONDecodeError:
+            print(f"Could not import {self.legacy_history_file}; it was left unchanged.")
+            return
+            
+        # rewrite_history also moves inline image payloads into the sidecar directory
+        self.messages = messages
+        self.rewrite_history()
+        self.messages = []
+        print(f"Imported {len(messages)} messages from {self.legacy_history_file}.")
+
     def load_history(self) -> None:
-        """Load chat history from file if it exists."""
-        if self.history_file.exists():
-            try:
-                with open(self.history_file, 'r') as f:
-                    self.messages = json.load(f)
-                print("Previous chat history loaded.")
-            except json.JSONDecodeError:
-                print("Error loading chat history. Starting fresh.")
-                self.messages = []
-        else:
-            self.messages = []
+        """Load chat history from file if it exists, skipping unreadable records."""
+        self.messages = []
+        self.saved_count = 0
+        self.import_legacy_history()
+        if not self.history_file.exists():
+            return
+            
+        skipped = 0
+        line = b""
+        with open(self.history_file, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    self.messages.append(self.unpack_message_images(orjson.loads(line)))
+                except orjson.JSONDecodeError:
+                    skipped += 1
+                    
+        # A write torn by a crash leaves no trailing newline; end the line so later appends stay separate
+        if line and not line.endswith(b"\n"):
+            with open(self.history_file, 'ab') as f:
+                f.write(b"\n")
+                
+        self.saved_count = len(self.messages)
+        if skipped:
+            print(f"Skipped {skipped} unreadable chat history record(s).")
+        print("Previous chat history loaded.")
 
     def save_history(self) -> None:
-        """Save chat history to file."""
-        with open(self.history_file, 'w') as f:
-            json.dump(self.messages, f, indent=2)
+        """
+        Append messages not yet written to the chat history file, one JSON record per line.
+        Local image payloads are kept in the sidecar directory.
+        """
+        with open(self.history_file, 'ab') as f:
+            f.write(self.serialize_messages(self.messages[self.saved_count:]))
+        self.saved_count = len(self.messages)
+
+    def clear_history(self) -> None:
+        """Clear chat history and cached image encodings in memory and on disk."""
+        self.messages = []
+        self._image_cache.clear()
+        self.rewrite_history()
+
+    def rewrite_history(self) -> None:
+        """Atomically replace the history file with the in-memory messages."""
+        tmp_file = self.history_file.with_suffix('.jsonl.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(self.serialize_messages(self.messages))
+        os.replace(tmp_file, self.history_file)
+        self.saved_count = len(self.messages)
+        self.prune_image_payloads()
+
+    def prune_image_payloads(self) -> None:
+        """Drop stored image payloads that no message in the history references any more."""
+        referenced = {}
+        for msg in self.messages:
+            content = msg["content"]
+            if not isinstance(content, list):
+                continue
+            for item in content:
+                url = item["image_url"].get("url", "") if item["type"] == "image_url" else ""
+                ref = self._image_refs.get(url)
+                if ref:
+                    referenced[url] = ref
+        self._image_refs = referenced
+        self._image_cache = {
+            path: entry for path, entry in self._image_cache.items() if entry[2] in referenced
+        }
+        
+        if not self.image_dir.is_dir():
+            return
+        live_refs = set(referenced.values())
+        for payload_file in self.image_dir.iterdir():
+            if payload_file.name not in live_refs:
+                payload_file.unlink()
+
+    def serialize_messages(self, messages: List[Dict]) -> bytes:
+        """Serialize messages as JSON Lines with image payloads moved to the sidecar directory."""
+        return b"".join(orjson.dumps(self.pack_message_images(msg)) + b"\n" for msg in messages)
+
+    def pack_message_images(self, message: Dict) -> Dict:
+        """Return a copy of the message with base64 image payloads replaced by sidecar references."""
+        content = message["content"]
+        if not isinstance(content, list):
+            return message
+            
+        packed = []
+        for item in content:
+            url = item["image_url"].get("url", "") if item["type"] == "image_url" else ""
+            if url.startswith("data:"):
+                packed.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "ref": self.store_image_payload(url)
+                    }
+                })
+            else:
+                packed.append(item)
+        return {**message, "content": packed}
+
+    def unpack_message_images(self, message: Dict) -> Dict:
+        """Replace sidecar image references in a loaded message with their base64 payloads."""
+        content = message["content"]
+        if not isinstance(content, list):
+            return message
+            
+        for idx, item in enumerate(content):
+            ref = item["image_url"].get("ref") if item["type"] == "image_url" else None
+            if not ref:
+                continue
+            data_url = self.load_image_payload(ref)
+            if data_url:
+                item["image_url"] = {"url": data_url}
+            else:
+                content[idx] = {"type": "text", "text": "[Missing image]"}
+        return message
+
+    def store_image_payload(self, data_url: str) -> str:
+        """Write an image data URL to the sidecar directory once and return its reference."""
+        ref = self._image_refs.get(data_url)
+        if ref is None:
+            ref = hashlib.sha1(data_url.encode('ascii')).hexdigest()
+            payload_file = self.image_dir / ref
+            if not payload_file.exists():
+                self.image_dir.mkdir(exist_ok=True)
+                # Write atomically so a crash can't leave a truncated payload behind
+                tmp_file = payload_file.with_suffix('.tmp')
+                with open(tmp_file, 'w') as f:
+                    f.write(data_url)
+                os.replace(tmp_file, payload_file)
+            self._image_refs[data_url] = ref
+        return ref
 
-    def extract_image_references(self, text: str) -> Tuple[List[str], List[str]]:
+    def load_image_payload(self, ref: str) -> Optional[str]:
+        """Read an image data URL from the sidecar directory."""
+        try:
+            data_url = (self.image_dir / ref).read_text()
+        except OSError:
+            print(f"Warning: Stored image not found: {ref}")
+            return None
+        self._image_refs[data_url] = ref
+        return data_url
+
+    def extract_image_references(self, text: str) -> Tuple[str, List[str], List[str]]:
         """
         Extract image URLs and file paths enclosed in double braces from text.
-        Returns tuple of (urls, file_paths)
+        Returns tuple of (clean_text, urls, file_paths) built in a single pass.
         """
-        pattern = r'\{\{(.*?)\}\}'
-        references = re.findall(pattern, text)
-        
+        parts = []
         urls = []
         file_paths = []
+        last_end = 0
         
-        for ref in references:
-            ref = ref.strip()
+        for match in _IMG_RE.finditer(text):
+            parts.append(text[last_end:match.start()])
+            last_end = match.end()
+            ref = match.group(1).strip()
             # Determine if it's a URL or file path
             if ref.startswith(('http://', 'https://')):
                 urls.append(ref)
             else:
                 # Treat as file path
                 file_paths.append(ref)
+        parts.append(text[last_end:])
                 
-        return urls, file_paths
+        return "".join(parts).strip(), urls, file_paths
     
-    def encode_image_to_base64(self, image_path: str) -> str:
-        """Encode an image file to base64."""
+    def encode_image_to_base64(self, image_path: str) -> Optional[str]:
+        """Encode an image file as a base64 data URL."""
         try:
+            # Open first and stat the handle, so each image costs a single path lookup
             with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+                stat = os.fstat(image_file.fileno())
+                cached = self._image_cache.get(image_path)
+                if cached and cached[:2] == (stat.st_mtime, stat.st_size):
+                    return cached[2]
+                    
+                header = image_file.read(12)
+                prefix = f"data:{_sniff_image_mime(header)};base64,".encode('ascii')
+                # Build the whole data URL in one preallocated buffer and decode it once
+                encoded = bytearray(len(prefix) + 4 * ((stat.st_size + 2) // 3))
+                encoded[:len(prefix)] = prefix
+                pos = len(prefix)
+                # Carry the header into the first chunk to keep 3-byte alignment
+                buf = header + image_file.read(_B64_CHUNK_SIZE - len(header))
+                while buf:
+                    chunk = base64.b64encode(buf)
+                    encoded[pos:pos + len(chunk)] = chunk
+                    pos += len(chunk)
+                    buf = image_file.read(_B64_CHUNK_SIZE)
+            # Trim in case the file shrank after it was stat'ed
+            del encoded[pos:]
+            data_url = encoded.decode('ascii')
+            del encoded
+            # Replaces any entry for an older version of the file
+            self._image_cache[image_path] = (stat.st_mtime, stat.st_size, data_url)
+            return data_url
+        except FileNotFoundError:
+            print(f"Warning: Image file not found: {image_path}")
+            return None
         except Exception as e:
             print(f"Error encoding image {image_path}: {str(e)}")
             return None
 
-    def create_message_content(self, text: str, image_urls: List[str], image_paths: List[str]) -> Union[str, List[Dict]]:
-        """Create message content with text, image URLs, and local image files."""
+    def create_message_content(self, clean_text: str, image_urls: List[str], image_paths: List[str]) -> Union[str, List[Dict]]:
+        """Create message content with text (placeholders already removed), image URLs, and local image files."""
         if not image_urls and not image_paths:
-            return text
+            return clean_text
 
-        # Remove the image placeholders from the text
-        clean_text = re.sub(r'\{\{.*?\}\}', '', text).strip()
-        
         # Create content list with text and images
         content = []
         
@@ -115,31 +397,113 @@ class ChatApp:
             })
             
         # Add local images (file paths)
-        for path in image_paths:
-            # Skip if path doesn't exist
-            if not os.path.exists(path):
-                print(f"Warning: Image file not found: {path}")
-                continue
-                
-            # Encode image to base64
-            base64_image = self.encode_image_to_base64(path)
-            if base64_image:
+        if not image_paths:
+            return content
+        
+        # Encode images to base64, concurrently when there is more than one, keeping the original order
+        if len(image_paths) == 1:
+            encoded_images = [self.encode_image_to_base64(image_paths[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(_MAX_ENCODE_WORKERS, len(image_paths))) as executor:
+                encoded_images = list(executor.map(self.encode_image_to_base64, image_paths))
+        
+        for data_url in encoded_images:
+            # Skip images that could not be read
+            if data_url:
                 content.append({
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{base64_image}"
+                        "url": data_url
                     }
                 })
             
         return content
 
-    def get_ai_response(self, user_input: str) -> None:
-        """Get response from OpenAI API."""
+    def count_content_tokens(self, encoding: "tiktoken.Encoding", content: Union[str, List[Dict]]) -> int:
+        """Approximate the number of prompt tokens in a message's content."""
+        # Count special-token text such as <|endoftext|> as ordinary text instead of raising
+        if isinstance(content, str):
+            return len(encoding.encode(content, disallowed_special=()))
+            
+        total = 0
+        for item in content:
+            if item["type"] == "text":
+                total += len(encoding.encode(item["text"], disallowed_special=()))
+            else:
+                total += _IMAGE_TOKEN_ESTIMATE
+        return total
+
+    def compact_history(self, pending_content: Union[str, List[Dict]]) -> None:
+        """Collapse older messages into a summary once the next prompt would exceed the token limit."""
+        encoding = _get_encoding()
+        if encoding is None:
+            return
+            
+        try:
+            pending_tokens = self.count_content_tokens(encoding, pending_content)
+            message_tokens = [self.count_content_tokens(encoding, msg["content"]) for msg in self.messages]
+        except Exception as e:
+            print(f"Error counting chat history tokens: {str(e)}")
+            return
+            
+        if pending_tokens + sum(message_tokens) <= _HISTORY_TOKEN_LIMIT:
+            return
+            
+        # Keep the newest messages verbatim while they fit in the recent-token budget
+        keep = 0
+        recent_tokens = pending_tokens
+        while keep < len(message_tokens) and recent_tokens + message_tokens[-1 - keep] <= _KEEP_RECENT_TOKENS:
+            recent_tokens += message_tokens[-1 - keep]
+            keep += 1
+            
+        older = self.messages[:len(self.messages) - keep]
+        recent = self.messages[len(self.messages) - keep:]
+        
+        # A lone previous summary has nothing left to collapse
+        if len(older) < 2:
+            return
+            
+        transcript = "\n".join(f"{msg['role']}: {self.format_history_content(msg['content'])}" for msg in older)
+        
+        try:
+            response = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "Summarize the following conversation concisely, keeping any facts needed to continue it."
+                    },
+                    {
+                        "role": "user",
+                        "content": transcript
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=512
+            )
+            summary = response.choices[0].message.content
+        except Exception as e:
+            print(f"Error summarizing chat history: {str(e)}")
+            return
+            
+        self.messages = [{
+            "role": "system",
+            "content": f"Summary of the earlier conversation: {summary}"
+        }] + recent
+        
+        # The log no longer matches the in-memory history
+        self.rewrite_history()
+
+    def get_ai_response(self, user_input: str) -> str:
+        """Get streaming response from OpenAI API, printing tokens as they arrive."""
         # Extract image references from input
-        image_urls, image_paths = self.extract_image_references(user_input)
+        clean_text, image_urls, image_paths = self.extract_image_references(user_input)
         
         # Create message content
-        content = self.create_message_content(user_input, image_urls, image_paths)
+        content = self.create_message_content(clean_text, image_urls, image_paths)
+        
+        # Keep the prompt size bounded before adding the new message
+        self.compact_history(content)
         
         # Add user message to history
         self.messages.append({
@@ -147,37 +511,86 @@ class ChatApp:
             "content": content
         })
         
+        # Print initial AI prompt
+        print("\nAI:", end=" ", flush=True)
+        
         try:
             # Get response from OpenAI
             has_images = len(image_urls) > 0 or len(image_paths) > 0
             model = "gpt-4o-mini"
             max_tokens = 4096
             
-            response = self.client.chat.completions.create(
+            stream = self.client.chat.completions.create(
                 model=model,
                 messages=self.messages,
                 temperature=0.7,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                stream=True
             )
             
+            # Display response pieces as they arrive
+            parts = []
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    delta = chunk.choices[0].delta.content
+                    print(delta, end="", flush=True)
+                    parts.append(delta)
+            print()
+            
             # Extract and store AI response
-            ai_response = response.choices[0].message.content
+            ai_response = "".join(parts)
             self.messages.append({
                 "role": "assistant",
                 "content": ai_response
             })
             
-            # Save updated history
+            # Append new messages to the history file
             self.save_history()
             
-            # Store the response
-            self.last_response = ai_response
-            
         except Exception as e:
-            self.last_response = f"Error: {str(e)}"
+            ai_response = f"Error: {str(e)}"
+            print(f"\n{ai_response}")
         
-        # Mark response generation as complete
-        self.is_generating = False
+        # Store the response
+        self.last_response = ai_response
+        return ai_response
+
+    async def get_ai_response_async(self, client: openai.AsyncOpenAI, user_input: str) -> str:
+        """Get response from OpenAI API for a single prompt, independent of chat history."""
+        clean_text, image_urls, image_paths = self.extract_image_references(user_input)
+        
+        # Read and encode local images off the event loop so other requests keep flowing
+        content = await asyncio.to_thread(self.create_message_content, clean_text, image_urls, image_paths)
+        
+        try:
+            response = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{
+                    "role": "user",
+                    "content": content
+                }],
+                temperature=0.7,
+                max_tokens=4096
+            )
+            return response.choices[0].message.content
+            
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def batch(self, prompts: List[str]) -> List[str]:
+        """Get responses for independent prompts concurrently, in the same order as prompts."""
+        async def gather_responses() -> List[str]:
+            # Bound in-flight requests so large batches don't run straight into rate limits
+            semaphore = asyncio.Semaphore(_MAX_BATCH_CONCURRENCY)
+            
+            async def bounded_response(client: openai.AsyncOpenAI, prompt: str) -> str:
+                async with semaphore:
+                    return await self.get_ai_response_async(client, prompt)
+                    
+            async with openai.AsyncOpenAI(api_key=self._api_key) as client:
+                return await asyncio.gather(*(bounded_response(client, prompt) for prompt in prompts))
+                
+        return asyncio.run(gather_responses())
 
     def format_history_content(self, content) -> str:
         """Format message content for display in history."""
@@ -185,54 +598,16 @@ class ChatApp:
             return content
             
         if isinstance(content, list):
+            formatters = _HISTORY_PART_FORMATTERS
             parts = []
             for item in content:
-                if item["type"] == "text":
-                    parts.append(item["text"])
-                elif item["type"] == "image_url":
-                    url = item["image_url"].get("url", "")
-                    # For local images (base64), show a placeholder instead of the entire string
-                    if url.startswith("data:image"):
-                        parts.append("[Local image]")
-                    else:
-                        parts.append(f"[Image: {url}]")
+                formatter = formatters.get(item["type"])
+                if formatter:
+                    parts.append(formatter(item))
             return " ".join(parts)
         
         return str(content)
 
-    def show_thinking_animation(self):
-        """Display a thinking animation while waiting for AI response."""
-        animation = "|/-\\"
-        idx = 0
-        start_time = time.time()
-        
-        # Continue until response is ready or timeout (60 seconds)
-        while self.is_generating and time.time() - start_time < 60:
-            print(f"\rAI thinking {animation[idx % len(animation)]}", end="")
-            idx += 1
-            time.sleep(0.1)
-        
-        # Clear the animation line
-        print("\r" + " " * 20 + "\r", end="")
-
-    def request_async_response(self, user_input: str):
-        """Start an asynchronous request for AI response."""
-        self.is_generating = True
-        
-        # Start the AI response in a separate thread
-        thread = threading.Thread(target=self.get_ai_response, args=(user_input,))
-        thread.daemon = True
-        thread.start()
-        
-        # Show thinking animation while waiting
-        self.show_thinking_animation()
-        
-        # Display the response once it's ready
-        if self.last_response:
-            print(f"AI: {self.last_response}")
-        else:
-            print("AI: Sorry, I couldn't generate a response.")
-
     def start_chat(self) -> None:
         """Start the chat interface."""
         print("\nWelcome to Terminal Chat!")
@@ -243,18 +618,18 @@ class ChatApp:
         
         while True:
             user_input = input("\nYou: ").strip()
+            command = user_input.lower()
             
-            if user_input.lower() == 'quit':
+            if command == 'quit':
                 print("Goodbye!")
                 break
                 
-            elif user_input.lower() == 'new':
-                self.messages = []
-                self.save_history()
+            elif command == 'new':
+                self.clear_history()
                 print("\nStarting new chat...")
                 continue
                 
-            elif user_input.lower() == 'history':
+            elif command == 'history':
                 print("\nChat History:")
                 for msg in self.messages:
                     role = "You" if msg["role"] == "user" else "AI"
@@ -265,14 +640,17 @@ class ChatApp:
             elif not user_input:
                 continue
                 
-            # Get and display AI response asynchronously
-            self.request_async_response(user_input)
+            # Get and display AI response as it streams in
+            self.get_ai_response(user_input)
 
 def main():
     try:
         # Start chat application
         chat_app = ChatApp()
-        chat_app.start_chat()
+        try:
+            chat_app.start_chat()
+        finally:
+            chat_app.close()
     except ValueError as e:
         print(f"\nError: {e}")
         print("Please create a .env file with your OpenAI API key:")